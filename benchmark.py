@@ -0,0 +1,53 @@
+"""
+Microbenchmark do laço de treino: passos/s com e sem o cache de max/argmax
+da tabela Q (LearningAgent.cache_greedy).
+
+Uso:
+    python benchmark.py
+"""
+import random
+import time
+
+from simulator import Simulator
+from learner import LearningAgent
+from main import CUSTOM_MAP
+
+
+def measure_steps_per_sec(simulator, cache_greedy, episodes=3000,
+                          warmup=2000, exploration_rate=0.1, seed=0):
+    """
+    Treina um agente novo por `warmup` episódios (para sair do regime de
+    exploração pura) e mede passos/s nos `episodes` seguintes.
+    """
+    random.seed(seed)
+    agent = LearningAgent(simulator)
+    agent.cache_greedy = cache_greedy
+    agent.exploration_rate = exploration_rate
+
+    for _ in range(warmup):
+        agent._train_episode(events=False)
+
+    total_steps = 0
+    start = time.perf_counter()
+    for _ in range(episodes):
+        total_steps += agent._train_episode(events=False)[1]
+    return total_steps / (time.perf_counter() - start)
+
+
+def main():
+    simulator = Simulator(
+        grid_size=len(CUSTOM_MAP), layout="CUSTOM", custom_map=CUSTOM_MAP
+    )
+
+    before = measure_steps_per_sec(simulator, cache_greedy=False)
+    after = measure_steps_per_sec(simulator, cache_greedy=True)
+
+    print("------------------------------------------------------")
+    print(f"Sem cache (np.max/np.argmax): {before:10.0f} passos/s")
+    print(f"Com cache (q_max/q_argmax):   {after:10.0f} passos/s")
+    print(f"Ganho: {after / before:.2f}x")
+    print("------------------------------------------------------")
+
+
+if __name__ == "__main__":
+    main()
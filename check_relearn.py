@@ -0,0 +1,77 @@
+"""
+Verificação do re-aprendizado incremental (LearningAgent.relearn) contra o
+solver exato: parte da tabela Q exata do mapa CUSTOM, aplica uma edição,
+faz apenas a varredura priorizada e compara com a tabela exata do mapa
+editado.
+
+Uso:
+    python check_relearn.py
+"""
+import sys
+import tempfile
+
+import numpy as np
+
+from simulator import Simulator
+from learner import LearningAgent
+from solver import LayeredSolver
+from main import CUSTOM_MAP
+
+# Edições verificadas: (célula, novo conteúdo)
+EDITS = [
+    ((0, 3), "P"),  # presente novo longe da porta
+    ((5, 3), "P"),  # presente novo perto da porta
+    ((0, 4), "."),  # presente removido
+    ((0, 1), "Z"),  # zumbi novo
+    ((2, 3), "#"),  # pedra nova
+]
+
+
+def edit_map(grid_map, cell, content):
+    rows = [list(row) for row in grid_map]
+    rows[cell[0]][cell[1]] = content
+    return ["".join(row) for row in rows]
+
+
+def exact_agent(simulator):
+    """LearningAgent com a q_table exata de LayeredSolver."""
+    agent = LearningAgent(simulator)
+    with tempfile.TemporaryDirectory() as out_dir:
+        solver = LayeredSolver(
+            simulator, out_dir, agent.discount_factor, workers=1
+        ).solve()
+        solver.fill_q_table(agent)
+    return agent
+
+
+def check_edit(cell, content):
+    """Retorna o maior erro |Q - Q*| nas células livres após relearn."""
+    edited_map = edit_map(CUSTOM_MAP, cell, content)
+    base = Simulator(grid_size=len(CUSTOM_MAP), layout="CUSTOM", custom_map=CUSTOM_MAP)
+    edited = Simulator(grid_size=len(edited_map), layout="CUSTOM", custom_map=edited_map)
+
+    agent = exact_agent(base)
+    agent.relearn(edited, episodes=0, threshold=1e-9)
+    reference = exact_agent(edited)
+
+    blocked = set(edited.zombie_positions) | set(edited.obstacle_positions)
+    free = np.array(
+        [[(i, j) not in blocked for j in range(edited.size)] for i in range(edited.size)]
+    )
+    return float(np.abs(agent.q_table - reference.q_table)[free].max())
+
+
+def main():
+    failures = 0
+    print("------------------------------------------------------")
+    for cell, content in EDITS:
+        error = check_edit(cell, content)
+        ok = error <= 1e-6
+        failures += not ok
+        print(f"{cell} -> '{content}': erro máximo {error:.2e} {'OK' if ok else 'FALHOU'}")
+    print("------------------------------------------------------")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
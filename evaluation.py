@@ -0,0 +1,170 @@
+import numpy as np
+
+
+def transition_table(simulator):
+    """
+    Tabela next_cell[célula, ação] com a célula resultante de cada movimento
+    (células numeradas como i * size + j), respeitando bordas e obstáculos.
+    """
+    size = simulator.size
+    obstacles = set(simulator.obstacle_positions)
+    next_cell = np.zeros((size * size, 4), dtype=np.int64)
+
+    for i in range(size):
+        for j in range(size):
+            moves = [
+                (max(i - 1, 0), j),         # 0: CIMA
+                (min(i + 1, size - 1), j),  # 1: BAIXO
+                (i, max(j - 1, 0)),         # 2: ESQUERDA
+                (i, min(j + 1, size - 1)),  # 3: DIREITA
+            ]
+            for action, (ni, nj) in enumerate(moves):
+                if (ni, nj) in obstacles:
+                    ni, nj = i, j
+                next_cell[i * size + j, action] = ni * size + nj
+
+    return next_cell
+
+
+def evaluate_policy(agent, all_masks=False):
+    """
+    Avalia a política greedy de um LearningAgent a partir de todas as células
+    livres (e, opcionalmente, de todas as máscaras de presentes) de uma vez,
+    com arrays NumPy: cada passo avança todas as execuções em paralelo.
+
+    Ciclos são detectados pelo algoritmo de Brent: como o ambiente e a
+    política são determinísticos, repetir um estado (célula, máscara)
+    significa que o agente ficará em loop até max_steps.
+
+    Retorna um dict com mapas de formato (size, size, num_masks):
+        success, returns, steps, looped  (NaN/False nas células não livres)
+    além de success_rate, mean_return e loop_rate agregados.
+    """
+    simulator = agent.simulator
+    size = simulator.size
+    num_items = len(agent.items_to_collect)
+    num_masks = 2**num_items
+    full_mask = num_masks - 1
+
+    next_cell = transition_table(simulator)
+
+    # Ação greedy por (célula, máscara), igual à escolha feita em test()
+    q_values = agent.q_table.reshape(size * size, num_masks, 4)
+    if agent.use_action_mask:
+        q_values = q_values + agent._action_penalty.reshape(size * size, 1, 4)
+    greedy = np.argmax(q_values, axis=-1)
+
+    # Atributos estáticos de cada célula
+    is_zombie = np.zeros(size * size, dtype=bool)
+    for i, j in simulator.zombie_positions:
+        is_zombie[i * size + j] = True
+    present_bit = np.zeros(size * size, dtype=np.int64)
+    for idx, (i, j) in enumerate(agent.items_to_collect):
+        present_bit[i * size + j] = 1 << (num_items - 1 - idx)
+    goal_cell = simulator.goal_position[0] * size + simulator.goal_position[1]
+
+    blocked = is_zombie.copy()
+    for i, j in simulator.obstacle_positions:
+        blocked[i * size + j] = True
+    free_cells = np.flatnonzero(~blocked)
+
+    masks = np.arange(num_masks) if all_masks else np.array([0])
+
+    # Uma execução para cada (célula livre, máscara)
+    start_cell = np.repeat(free_cells, len(masks))
+    start_mask = np.tile(masks, len(free_cells))
+    n = len(start_cell)
+
+    cell = start_cell.copy()
+    mask = start_mask.copy()
+    active = np.ones(n, dtype=bool)
+    success = np.zeros(n, dtype=bool)
+    looped = np.zeros(n, dtype=bool)
+    returns = np.zeros(n, dtype=float)
+    steps = np.zeros(n, dtype=np.int64)
+
+    # Estado do algoritmo de Brent
+    saved_cell = cell.copy()
+    saved_mask = mask.copy()
+    power = np.ones(n, dtype=np.int64)
+    lam = np.zeros(n, dtype=np.int64)
+
+    for _ in range(agent.max_steps):
+        idx = np.flatnonzero(active)
+        if idx.size == 0:
+            break
+
+        c = next_cell[cell[idx], greedy[cell[idx], mask[idx]]]
+        m = mask[idx]
+        bit = present_bit[c]
+
+        zombie = is_zombie[c]
+        collect = ~zombie & (bit != 0) & ((m & bit) == 0)
+        m = np.where(collect, m | bit, m)
+        escape = ~zombie & ~collect & (c == goal_cell) & (m == full_mask)
+
+        reward = np.where(zombie, -10.0, np.where(collect, 10.0, np.where(escape, 20.0, -1.0)))
+
+        cell[idx] = c
+        mask[idx] = m
+        returns[idx] += reward
+        steps[idx] += 1
+        success[idx] = escape
+
+        done = zombie | escape
+        cycle = ~done & (c == saved_cell[idx]) & (m == saved_mask[idx])
+        looped[idx] = cycle
+        active[idx] = ~(done | cycle)
+
+        # Brent: a cada potência de 2, o "ponteiro lento" salta para o atual
+        lam[idx] += 1
+        reset = lam[idx] == power[idx]
+        ridx = idx[reset]
+        saved_cell[ridx] = c[reset]
+        saved_mask[ridx] = m[reset]
+        power[ridx] *= 2
+        lam[ridx] = 0
+
+    shape = (size * size, len(masks))
+
+    def to_map(values, fill):
+        out = np.full(shape, fill, dtype=np.result_type(values, type(fill)))
+        out[free_cells] = values.reshape(len(free_cells), len(masks))
+        return out.reshape(size, size, len(masks))
+
+    return {
+        "masks": masks,
+        "success": to_map(success, False),
+        "returns": to_map(returns, np.nan),
+        "steps": to_map(steps.astype(float), np.nan),
+        "looped": to_map(looped, False),
+        "success_rate": float(success.mean()) if n else 0.0,
+        "mean_return": float(returns.mean()) if n else 0.0,
+        "loop_rate": float(looped.mean()) if n else 0.0,
+    }
+
+
+def print_evaluation(results):
+    """Resumo textual da avaliação (mapa de sucesso para a máscara 0)."""
+    print("------------------------------------------------------")
+    print(f"Taxa de sucesso:  {results['success_rate']:.1%}")
+    print(f"Retorno médio:    {results['mean_return']:.2f}")
+    print(f"Execuções em loop: {results['loop_rate']:.1%}")
+    print("Mapa (máscara 0): S=sucesso, L=loop, x=falha, #=bloqueada")
+
+    success = results["success"][:, :, 0]
+    looped = results["looped"][:, :, 0]
+    steps = results["steps"][:, :, 0]
+    for i in range(success.shape[0]):
+        row = ""
+        for j in range(success.shape[1]):
+            if np.isnan(steps[i, j]):
+                row += "#"
+            elif success[i, j]:
+                row += "S"
+            elif looped[i, j]:
+                row += "L"
+            else:
+                row += "x"
+        print(row)
+    print("------------------------------------------------------")
@@ -0,0 +1,263 @@
+import random
+
+import numpy as np
+import pygame
+
+from learner import LearningAgent
+from metrics import TrainingMetrics
+from utils import handle_events
+
+
+class HierarchicalAgent(LearningAgent):
+    """
+    Agente hierárquico: em vez de ações primitivas (CIMA/BAIXO/...), escolhe
+    macro-ações ("opções"):
+      - opção p (0..k-1): ir até o presente p
+      - opção k         : ir até a porta
+    Cada opção é executada como o caminho mais curto (BFS) que evita zumbis,
+    guardado em cache. O Simulator continua executando os movimentos primitivos.
+
+    O Q-Learning acontece sobre (marco_atual, máscara) x opções, onde o marco
+    é o último presente alcançado (0..k-1) ou a posição inicial (k).
+    """
+
+    def __init__(self, simulator):
+        super().__init__(simulator)
+
+        # Menos episódios: cada episódio tem no máximo k+1 decisões
+        self.total_episodes = 3000
+        self.exploration_decay = 0.003
+
+        num_items = len(self.items_to_collect)
+        self.start_landmark = num_items
+        self.door_option = num_items
+        self.full_mask = 2**num_items - 1
+
+        # Marcos de origem (presentes + início) e alvos das opções (presentes + porta)
+        self.landmarks = self.items_to_collect + [simulator.start_position]
+        self.targets = self.items_to_collect + [simulator.goal_position]
+
+        self._paths = {}  # (marco, opção) -> lista de ações primitivas
+
+    def _build_q_table(self):
+        """Tabela Q: [marco][máscara_itens][opção]."""
+        num_items = len(self.items_to_collect)
+        return np.zeros((num_items + 1, 2**num_items, num_items + 1), dtype=float)
+
+    def _rebuild_greedy_cache(self):
+        """A tabela de opções não usa o cache de max/argmax por célula."""
+        self.cache_greedy = False
+
+    def relearn(self, simulator, screen=None, cell_size=None, episodes=1000,
+                max_updates=None, threshold=1e-3):
+        """
+        O re-aprendizado incremental de LearningAgent supõe a tabela
+        [linha][coluna][máscara][ação]; a tabela de opções é indexada por
+        marcos, que mudam junto com os presentes. Treine um novo agente.
+        """
+        raise ValueError(
+            "Re-aprendizado incremental não é suportado pelo agente "
+            "hierárquico; treine um novo HierarchicalAgent no mapa alterado."
+        )
+
+    # --------------------------------------------------------------------- #
+    # Opções (macro-ações)
+    # --------------------------------------------------------------------- #
+
+    def _option_path(self, landmark, option):
+        """Caminho em cache do marco até o alvo da opção (None se impossível)."""
+        key = (landmark, option)
+        if key not in self._paths:
+            start = self.landmarks[landmark]
+            target = self.targets[option]
+            path = self._bfs_path(start, target)
+            self._paths[key] = path if (path or start == target) else None
+        return self._paths[key]
+
+    def _valid_options(self, landmark, mask):
+        """
+        Opções que fazem sentido no estado: presentes ainda não coletados
+        e alcançáveis; a porta apenas quando todos os presentes foram coletados.
+        """
+        num_items = len(self.items_to_collect)
+        if mask == self.full_mask:
+            candidates = [self.door_option]
+        else:
+            candidates = [
+                p for p in range(num_items)
+                if not mask & (1 << (num_items - 1 - p))
+            ]
+        return [o for o in candidates if self._option_path(landmark, o) is not None]
+
+    def _best_option(self, landmark, mask, options):
+        q_values = self.q_table[landmark, mask]
+        return max(options, key=lambda o: q_values[o])
+
+    def choose_option(self, landmark, mask, options):
+        """Política epsilon-greedy sobre as opções válidas."""
+        if random.uniform(0.0, 1.0) < self.exploration_rate:
+            return random.choice(options)
+        return self._best_option(landmark, mask, options)
+
+    def _run_option(self, landmark, option, steps_left, screen=None, cell_size=None):
+        """
+        Executa a opção passo a passo no Simulator.
+        Retorna (recompensa_descontada, recompensa_total, passos, done, status, itens).
+        """
+        discounted = 0.0
+        total = 0.0
+        steps = 0
+        done = False
+        status = ""
+        collected_items = tuple(self.simulator.collected_presents)
+
+        for action in self._option_path(landmark, option):
+            if steps >= steps_left:
+                break
+
+            handle_events()
+            _, collected_items, reward, done, status = self.simulator.step(action)
+            discounted += (self.discount_factor ** steps) * reward
+            total += reward
+            steps += 1
+
+            if screen is not None:
+                self.simulator.render(screen, cell_size)
+                pygame.time.wait(150)
+
+            if done:
+                break
+
+        return discounted, total, steps, done, status, collected_items
+
+    # --------------------------------------------------------------------- #
+    # Q-Learning sobre opções (SMDP)
+    # --------------------------------------------------------------------- #
+
+    def train(self, screen, cell_size, metrics_path=None):
+        """
+        Treino via Q-Learning semi-markoviano sobre as opções:
+        Q(s,o) += alfa * (R + gamma^tau * max Q(s',o') - Q(s,o)),
+        onde R é a recompensa descontada acumulada durante os tau passos da opção.
+        """
+        print("---------------------------------")
+        print("TREINANDO O AGENTE (OPÇÕES)......")
+        window_size = 1000
+        metrics = TrainingMetrics(window_size=window_size, path=metrics_path)
+
+        try:
+            for episode in range(self.total_episodes + 1):
+                _, collected_items = self.simulator.reset()
+                landmark = self.start_landmark
+                mask = 0
+                done = False
+                steps = 0
+                episode_reward = 0.0
+                status = ""
+
+                while not done and steps < self.max_steps:
+                    options = self._valid_options(landmark, mask)
+                    if not options:
+                        break
+
+                    option = self.choose_option(landmark, mask, options)
+                    discounted, total, tau, done, status, collected_items = self._run_option(
+                        landmark, option, self.max_steps - steps
+                    )
+
+                    next_landmark = self.start_landmark if option == self.door_option else option
+                    next_mask = self._items_to_index(collected_items)
+
+                    old_value = self.q_table[landmark, mask, option]
+                    if done:
+                        target = discounted
+                    else:
+                        next_options = self._valid_options(next_landmark, next_mask)
+                        next_max = (
+                            max(self.q_table[next_landmark, next_mask, o] for o in next_options)
+                            if next_options else 0.0
+                        )
+                        target = discounted + (self.discount_factor ** tau) * next_max
+
+                    self.q_table[landmark, mask, option] = (
+                        old_value + self.learning_rate * (target - old_value)
+                    )
+
+                    landmark, mask = next_landmark, next_mask
+                    episode_reward += total
+                    steps += tau
+
+                if not done:
+                    status = "LIMITE DE PASSOS"
+                metrics.record(
+                    episode, episode_reward, steps, status, self.exploration_rate
+                )
+
+                self.exploration_rate = max(
+                    self.min_exploration,
+                    self.exploration_rate * (1.0 - self.exploration_decay),
+                )
+
+                if episode % 1000 == 0:
+                    print(
+                        f"Episódio: {episode:5d} | "
+                        f"Recompensa média (últ. {window_size}): {metrics.rewards.mean:6.2f} | "
+                        f"Passos médios: {metrics.steps.mean:5.1f} | "
+                        f"Epsilon: {self.exploration_rate:.3f}"
+                    )
+        finally:
+            # Também em sys.exit() (ESC / fechar a janela em handle_events)
+            metrics.close()
+        self.metrics = metrics
+
+    def test(self, screen, cell_size):
+        """Executa a política greedy sobre as opções, renderizando cada passo."""
+        _, collected_items = self.simulator.reset()
+        landmark = self.start_landmark
+        mask = 0
+        done = False
+        steps = 0
+        total_reward = 0.0
+        status = "ANDANDO"
+
+        print("TESTANDO O AGENTE (opções):")
+        print("------------------------------------------------------")
+
+        while not done and steps < self.max_steps:
+            options = self._valid_options(landmark, mask)
+            if not options:
+                status = "SEM OPÇÕES VÁLIDAS"
+                break
+
+            option = self._best_option(landmark, mask, options)
+            _, reward, tau, done, new_status, collected_items = self._run_option(
+                landmark, option, self.max_steps - steps, screen, cell_size
+            )
+            total_reward += reward
+            steps += tau
+            if new_status:
+                status = new_status
+
+            target_name = "PORTA" if option == self.door_option else f"PRESENTE {option}"
+            print(
+                f"Opção → {target_name:<11} ({tau:2d} passos) {status:<40} "
+                f"Recompensa: {reward:+5.1f} | Total: {total_reward:+5.1f}"
+            )
+
+            landmark = self.start_landmark if option == self.door_option else option
+            mask = self._items_to_index(collected_items)
+
+        if not done and steps >= self.max_steps:
+            status = "LIMITE DE PASSOS / SEM SOLUÇÃO"
+
+        print("------------------------------------------------------")
+        print(f"Status final: {status}")
+        print(
+            f"Presentes coletados: {len(collected_items)} "
+            f"de {self.simulator.num_presents}"
+        )
+        print(f"Passos executados: {steps}")
+        print(f"Recompensa total acumulada: {total_reward:.0f}")
+        print("------------------------------------------------------")
+
+        return status, collected_items, steps
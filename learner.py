@@ -1,9 +1,12 @@
+import heapq
 import random
 from collections import deque
 
 import numpy as np
 import pygame
 
+from evaluation import transition_table
+from metrics import TrainingMetrics
 from utils import handle_events
 
 
@@ -22,36 +25,117 @@ class LearningAgent:
         self.exploration_rate = 1.0         # epsilon inicial
         self.min_exploration = 0.01         # epsilon mínimo
         self.exploration_decay = 0.001      # taxa de decaimento do epsilon
+        self.use_action_mask = True         # ignora ações que não saem do lugar
+        self.cache_greedy = True            # mantém max/argmax de Q por estado
 
         # Ambiente
         self.simulator = simulator
         self.grid_size = simulator.size
         self.items_to_collect = list(simulator.present_positions)  # ordem fixa dos presentes
+        self._build_item_bits()
 
-        # Tabela Q: [linha][coluna][máscara_itens][ação]
+        self.q_table = self._build_q_table()
+        self._build_action_penalty()
+        self._rebuild_greedy_cache()
+
+    def _build_q_table(self):
+        """Tabela Q: [linha][coluna][máscara_itens][ação]."""
         num_items = len(self.items_to_collect)
-        self.q_table = np.zeros(
+        return np.zeros(
             (self.grid_size, self.grid_size, 2**num_items, 4),
             dtype=float,
         )
 
+    def _build_action_penalty(self):
+        """
+        Penalidade por célula e ação: 0 para ações válidas e -inf para as
+        que batem em borda/obstáculo. Somada aos valores Q, restringe
+        argmax/max às ações válidas do Simulator.
+        """
+        self._action_penalty = np.where(
+            self.simulator.valid_action_table, 0.0, -np.inf
+        )
+
+    def _rebuild_greedy_cache(self):
+        """
+        Arrays auxiliares com o valor máximo (q_max) e a ação greedy
+        (q_argmax) de cada (linha, coluna, máscara), respeitando
+        use_action_mask. Evitam np.max/np.argmax sobre 4 valores a cada
+        passo. Chamado por set_q_table; chame diretamente apenas se
+        use_action_mask for alterado.
+        """
+        if not self.cache_greedy:
+            return
+        q_values = self.q_table
+        if self.use_action_mask:
+            q_values = q_values + self._action_penalty[:, :, None, :]
+        self.q_argmax = np.argmax(q_values, axis=-1)
+        self.q_max = np.take_along_axis(
+            q_values, self.q_argmax[..., None], axis=-1
+        )[..., 0]
+
+    def set_q_table(self, q_table):
+        """
+        Substitui a tabela Q (treino paralelo, offline, solver...) e
+        reconstrói o cache de max/argmax. Toda escrita de uma tabela nova
+        vinda de fora do agente deve passar por aqui.
+        """
+        self.q_table = q_table
+        self._rebuild_greedy_cache()
+
+    def _refresh_greedy_row(self, i, j, item_index):
+        """Recalcula max/argmax em cache de um único estado."""
+        q_values = self._q_values((i, j), item_index)
+        best = int(np.argmax(q_values))
+        self.q_argmax[i, j, item_index] = best
+        self.q_max[i, j, item_index] = q_values[best]
+
+    def _update_q(self, state, item_index, action, value):
+        """
+        Grava um valor Q e atualiza o cache de max/argmax de forma
+        incremental; só reescaneia as 4 ações quando o máximo diminui.
+        """
+        i, j = state
+        self.q_table[i, j, item_index, action] = value
+        if not self.cache_greedy:
+            return
+        if self.use_action_mask and self._action_penalty[i, j, action]:
+            return  # ação inválida nunca é greedy
+
+        best = self.q_argmax[i, j, item_index]
+        best_value = self.q_max[i, j, item_index]
+        if action == best:
+            if value >= best_value:
+                self.q_max[i, j, item_index] = value
+            else:
+                self._refresh_greedy_row(i, j, item_index)
+        elif value > best_value or (value == best_value and action < best):
+            # Empate favorece a menor ação, como np.argmax
+            self.q_argmax[i, j, item_index] = action
+            self.q_max[i, j, item_index] = value
+
     # --------------------------------------------------------------------- #
     # Utilidades internas
     # --------------------------------------------------------------------- #
 
+    def _build_item_bits(self):
+        """Bit de cada presente na máscara (o primeiro é o mais significativo)."""
+        num_items = len(self.items_to_collect)
+        self._item_bits = {
+            pos: 1 << (num_items - 1 - i)
+            for i, pos in enumerate(self.items_to_collect)
+        }
+
     def _items_to_index(self, collected_items):
         """
         Converte o conjunto de itens coletados em um índice inteiro
         usando máscara binária com base em self.items_to_collect.
         """
-        collected_set = set(collected_items)
-        bits = [
-            "1" if (i, j) in collected_set else "0"
-            for (i, j) in self.items_to_collect
-        ]
-        if not bits:
-            return 0
-        return int("".join(bits), 2)
+        item_bits = self._item_bits
+        index = 0
+        for pos in set(collected_items):
+            index |= item_bits.get(pos, 0)
+        return index
 
     def _simulate_move(self, state, action):
         """
@@ -83,8 +167,13 @@ class LearningAgent:
         Retorna lista de ações [0..3]. Se não houver caminho, retorna [].
         (Mantido como utilitário extra; não usado diretamente no Q-Learning.)
         """
-        goal = self.simulator.goal_position
-        size = self.simulator.size
+        return self._bfs_path(start, self.simulator.goal_position)
+
+    def _bfs_path(self, start, goal):
+        """
+        Busca em largura de `start` até `goal`, evitando zumbis e obstáculos.
+        Retorna lista de ações [0..3]. Se não houver caminho, retorna [].
+        """
         zombies = set(self.simulator.zombie_positions)
 
         if start == goal:
@@ -130,6 +219,23 @@ class LearningAgent:
         actions.reverse()
         return actions
 
+    def _q_values(self, state, item_index):
+        """Valores Q do estado, com -inf nas ações inválidas se use_action_mask."""
+        q_values = self.q_table[state[0], state[1], item_index]
+        if self.use_action_mask:
+            q_values = q_values + self._action_penalty[state[0], state[1]]
+        return q_values
+
+    def _greedy_action(self, state, item_index):
+        if self.cache_greedy:
+            return int(self.q_argmax[state[0], state[1], item_index])
+        return int(np.argmax(self._q_values(state, item_index)))
+
+    def _max_q(self, state, item_index):
+        if self.cache_greedy:
+            return self.q_max[state[0], state[1], item_index]
+        return np.max(self._q_values(state, item_index))
+
     # --------------------------------------------------------------------- #
     # Política e Q-Learning
     # --------------------------------------------------------------------- #
@@ -143,86 +249,327 @@ class LearningAgent:
 
         # Exploração
         if random.uniform(0.0, 1.0) < self.exploration_rate:
+            if self.use_action_mask:
+                return random.choice(self.simulator.valid_actions(state))
             return random.randint(0, 3)  # 0:CIMA, 1:BAIXO, 2:ESQ, 3:DIR
 
         # Exploitation (ação com maior valor Q)
-        return int(np.argmax(self.q_table[state[0], state[1], item_index]))
+        return self._greedy_action(state, item_index)
+
+    def _train_episode(self, events=True):
+        """
+        Executa um episódio de treino com atualizações Q-Learning.
+        Retorna (recompensa_total, passos, done, status).
+        `events=False` dispensa o processamento de eventos do Pygame
+        (usado por processos sem janela).
+        """
+        state, collected_items = self.simulator.reset()
+        done = False
+        steps = 0
+        episode_reward = 0.0
+        status = ""
+
+        while not done and steps < self.max_steps:
+            if events:
+                handle_events()
+
+            action = self.choose_action(state, collected_items)
+            next_state, next_items, reward, done, status = self.simulator.step(
+                action
+            )
+
+            current_item_index = self._items_to_index(collected_items)
+            next_item_index = self._items_to_index(next_items)
+
+            # Q atual
+            old_value = self.q_table[
+                state[0], state[1], current_item_index, action
+            ]
 
-    def train(self, screen, cell_size):
+            # Target Bellman
+            if done:
+                target = reward
+            else:
+                next_max = self._max_q(next_state, next_item_index)
+                target = reward + self.discount_factor * next_max
+
+            # Atualização Q-Learning
+            new_value = old_value + self.learning_rate * (target - old_value)
+            self._update_q(state, current_item_index, action, new_value)
+
+            state, collected_items = next_state, next_items
+            episode_reward += reward
+            steps += 1
+
+        return episode_reward, steps, done, status
+
+    def train(self, screen, cell_size, metrics_path=None):
         """
         Treino do agente via Q-Learning.
+        Se `metrics_path` (.jsonl ou .csv) for informado, as métricas de cada
+        episódio são gravadas em segundo plano nesse arquivo.
         """
         print("---------------------------------")
         print("TREINANDO O AGENTE...........")
-        rewards_history = []
         window_size = 1000
+        metrics = TrainingMetrics(window_size=window_size, path=metrics_path)
 
-        for episode in range(self.total_episodes + 1):
-            state, collected_items = self.simulator.reset()
-            done = False
-            steps = 0
-            episode_reward = 0.0
+        try:
+            for episode in range(self.total_episodes + 1):
+                episode_reward, steps, done, status = self._train_episode()
 
-            while not done and steps < self.max_steps:
-                handle_events()
+                if not done:
+                    status = "LIMITE DE PASSOS"
+                metrics.record(
+                    episode, episode_reward, steps, status, self.exploration_rate
+                )
 
-                action = self.choose_action(state, collected_items)
-                next_state, next_items, reward, done, status = self.simulator.step(
-                    action
+                # Atualiza epsilon (exploração)
+                self.exploration_rate = max(
+                    self.min_exploration,
+                    self.exploration_rate * (1.0 - self.exploration_decay),
                 )
 
-                current_item_index = self._items_to_index(collected_items)
-                next_item_index = self._items_to_index(next_items)
+                # Log a cada 1000 episódios
+                if episode % 1000 == 0:
+                    print(
+                        f"Episódio: {episode:5d} | "
+                        f"Recompensa média (últ. {window_size}): {metrics.rewards.mean:6.2f} | "
+                        f"Passos médios: {metrics.steps.mean:5.1f} | "
+                        f"Epsilon: {self.exploration_rate:.3f}"
+                    )
 
-                # Q atual
-                old_value = self.q_table[
-                    state[0], state[1], current_item_index, action
-                ]
+                    # Renderiza para visualização durante o treino
+                    self.simulator.render(screen, cell_size)
+                    pygame.time.wait(200)
+        finally:
+            # Também em sys.exit() (ESC / fechar a janela em handle_events)
+            metrics.close()
+        self.metrics = metrics
 
-                # Target Bellman
-                if done:
-                    target = reward
-                else:
-                    next_max = np.max(
-                        self.q_table[next_state[0], next_state[1], next_item_index]
-                    )
-                    target = reward + self.discount_factor * next_max
+    # --------------------------------------------------------------------- #
+    # Re-aprendizado incremental (mapa alterado)
+    # --------------------------------------------------------------------- #
 
-                # Atualização Q-Learning
-                new_value = old_value + self.learning_rate * (target - old_value)
-                self.q_table[
-                    state[0], state[1], current_item_index, action
-                ] = new_value
+    def relearn(self, simulator, screen=None, cell_size=None, episodes=1000,
+                max_updates=None, threshold=1e-3):
+        """
+        Adapta a tabela Q já treinada a um novo mapa (mesmo tamanho de grid)
+        em vez de treinar do zero:
+          1. compara os mapas (Simulator.diff_map);
+          2. remapeia os bits da máscara se os presentes mudaram;
+          3. faz atualizações de Bellman priorizadas (prioritized sweeping),
+             usando o modelo do Simulator, a partir das células alteradas e
+             de seus vizinhos/predecessores, só nas máscaras afetadas;
+          4. opcionalmente, roda poucos episódios de Q-Learning com epsilon
+             baixo, sem renderização.
+        `max_updates` limita o número de backups de estado (None = sem
+        limite). Se `screen` for informado, o mapa novo é desenhado ao final.
+        Retorna o dicionário de células alteradas.
+        """
+        if simulator.size != self.grid_size:
+            raise ValueError(
+                "Re-aprendizado incremental exige o mesmo tamanho de grid."
+            )
 
-                state, collected_items = next_state, next_items
-                episode_reward += reward
-                steps += 1
+        changes = self.simulator.diff_map(simulator)
+        self.simulator = simulator
+        self._build_action_penalty()
+        self.max_steps = simulator.size * 10
+        self._remap_items(list(simulator.present_positions))
+        self._rebuild_greedy_cache()
 
-            rewards_history.append(episode_reward)
+        print("---------------------------------")
+        print(f"RE-APRENDENDO ({len(changes)} células alteradas)...")
+        updates = self._sweep_changes(changes, max_updates, threshold)
+        print(f"Atualizações de Bellman focadas: {updates}")
+
+        if episodes:
+            self.exploration_rate = max(self.min_exploration, 0.1)
+            for _ in range(episodes):
+                self._train_episode(events=False)
+                self.exploration_rate = max(
+                    self.min_exploration,
+                    self.exploration_rate * (1.0 - self.exploration_decay),
+                )
 
-            # Atualiza epsilon (exploração)
-            self.exploration_rate = max(
-                self.min_exploration,
-                self.exploration_rate * (1.0 - self.exploration_decay),
-            )
+        if screen is not None:
+            self.simulator.render(screen, cell_size)
 
-            # Log a cada 1000 episódios
-            if episode % 1000 == 0:
-                if rewards_history:
-                    window = rewards_history[-window_size:]
-                    avg_reward = sum(window) / len(window)
-                else:
-                    avg_reward = 0.0
+        return changes
+
+    def _remap_items(self, new_items):
+        """
+        Reindexa a dimensão de máscara da tabela Q para uma nova lista de
+        presentes. Presentes mantidos conservam seu bit; presentes removidos
+        são tratados como já coletados; presentes novos começam sem histórico
+        (copiam os valores da máscara equivalente sem eles).
+        """
+        old_items = self.items_to_collect
+        if new_items == old_items:
+            return
+
+        k_old = len(old_items)
+        k_new = len(new_items)
+        old_bit = {pos: 1 << (k_old - 1 - i) for i, pos in enumerate(old_items)}
+        new_set = set(new_items)
+
+        new_masks = np.arange(2**k_new)
+        mapping = np.full(
+            2**k_new,
+            sum(bit for pos, bit in old_bit.items() if pos not in new_set),
+        )
+        for i, pos in enumerate(new_items):
+            if pos in old_bit:
+                has_item = (new_masks >> (k_new - 1 - i)) & 1
+                mapping += has_item * old_bit[pos]
+
+        self.items_to_collect = new_items
+        self._build_item_bits()
+        self.set_q_table(self.q_table[:, :, mapping, :])
+
+    def _seed_masks(self, cell, before, after):
+        """
+        Máscaras a revisar em volta de uma célula alterada.
+        A posição inicial não afeta as transições. Um presente novo só
+        altera as máscaras em que ainda não foi coletado (as demais copiam
+        a máscara equivalente sem ele). Um presente removido não muda as
+        transições, mas passa a valer "coletado" em todas as máscaras,
+        inclusive em ordens de coleta que o treino nunca visitou: todas
+        são revisadas.
+        """
+        num_masks = 2**len(self.items_to_collect)
+        before = "." if before == "R" else before
+        after = "." if after == "R" else after
 
+        if before == after:
+            return np.zeros(num_masks, dtype=bool)
+        if before == "." and after == "P":
+            return (np.arange(num_masks) & self._item_bits[cell]) == 0
+        return np.ones(num_masks, dtype=bool)
+
+    def _sweep_changes(self, changes, max_updates=None, threshold=1e-3):
+        """
+        Prioritized sweeping com o modelo do Simulator, vetorizado sobre as
+        máscaras: cada item da fila é uma célula com o conjunto de máscaras
+        pendentes, e um backup atualiza todas elas de uma vez.
+        Sementes: células alteradas e vizinhas, nas máscaras afetadas.
+        Quando o valor de (célula, máscara) muda mais que `threshold`, os
+        predecessores entram na fila nas máscaras correspondentes.
+        Retorna o número de backups de estado (célula, máscara).
+        """
+        sim = self.simulator
+        size = self.grid_size
+        gamma = self.discount_factor
+        num_masks = 2**len(self.items_to_collect)
+        full_mask = num_masks - 1
+        masks = np.arange(num_masks)
+        next_cell = transition_table(sim)
+        skip = set(sim.zombie_positions) | set(sim.obstacle_positions)
+
+        def state_values(pos):
+            if self.cache_greedy:
+                return self.q_max[pos[0], pos[1]]
+            return self._q_values(pos, slice(None)).max(axis=-1)
+
+        def neighbours(pos):
+            i, j = pos
+            cells = [pos, (i - 1, j), (i + 1, j), (i, j - 1), (i, j + 1)]
+            return [
+                (a, b) for a, b in cells
+                if 0 <= a < size and 0 <= b < size and (a, b) not in skip
+            ]
+
+        pending = {}  # célula -> máscaras pendentes (bool por máscara)
+        # Nas sementes o valor pode já ter mudado antes do backup (ações
+        # que passaram a bater em obstáculo saem de q_max ao reconstruir o
+        # cache), então elas sempre propagam para os predecessores
+        seeded = {}
+        heap = []
+
+        def push(pos, dirty, priority):
+            if pos in pending:
+                pending[pos] |= dirty
+            else:
+                pending[pos] = dirty.copy()
+            heapq.heappush(heap, (-priority, pos))
+
+        for cell, (before, after) in changes.items():
+            seeds = [(cell, self._seed_masks(cell, before, after))]
+            if after == "P" and before != "P":
+                # Um presente novo muda full_mask: nas máscaras sem ele, a
+                # porta deixa de abrir (inclusive na antiga máscara completa)
+                lacking = (masks & self._item_bits[cell]) == 0
+                seeds.append((sim.goal_position, lacking))
+            for seed_cell, dirty in seeds:
+                if not dirty.any():
+                    continue
+                for pos in neighbours(seed_cell):
+                    push(pos, dirty, np.inf)
+                    seeded[pos] = seeded.get(pos, False) | dirty
+
+        updates = 0
+        while heap:
+            _, pos = heapq.heappop(heap)
+            dirty = pending.pop(pos, None)
+            if dirty is None:
+                continue  # entrada repetida, já processada
+            if max_updates is not None and updates >= max_updates:
                 print(
-                    f"Episódio: {episode:5d} | "
-                    f"Recompensa média (últ. {window_size}): {avg_reward:6.2f} | "
-                    f"Epsilon: {self.exploration_rate:.3f}"
+                    "Aviso: limite de atualizações atingido; "
+                    "a tabela Q pode não ter convergido."
                 )
+                break
 
-                # Renderiza para visualização durante o treino
-                self.simulator.render(screen, cell_size)
-                pygame.time.wait(200)
+            i, j = pos
+            sel = np.flatnonzero(dirty)
+            q_rows = np.empty((len(sel), 4))
+            for action in range(4):
+                nxt = divmod(int(next_cell[i * size + j, action]), size)
+                if nxt in sim.zombie_positions:
+                    q_rows[:, action] = -10.0
+                    continue
+
+                values = state_values(nxt)
+                stay = -1.0 + gamma * values[sel]
+                bit = self._item_bits.get(nxt, 0)
+                if bit:
+                    collect = (sel & bit) == 0
+                    q_rows[:, action] = np.where(
+                        collect, 10.0 + gamma * values[sel | bit], stay
+                    )
+                elif nxt == sim.goal_position:
+                    q_rows[:, action] = np.where(sel == full_mask, 20.0, stay)
+                else:
+                    q_rows[:, action] = stay
+
+            old_values = state_values(pos)[sel].copy()
+            self.q_table[i, j, sel] = q_rows
+            if self.cache_greedy:
+                q_values = self._q_values(pos, sel)
+                self.q_argmax[i, j, sel] = np.argmax(q_values, axis=-1)
+                self.q_max[i, j, sel] = q_values.max(axis=-1)
+            updates += len(sel)
+
+            change = np.abs(state_values(pos)[sel] - old_values)
+            moved = change > threshold
+            if pos in seeded:
+                moved |= seeded.pop(pos)[sel]
+            if not moved.any():
+                continue
+
+            changed = np.zeros(num_masks, dtype=bool)
+            changed[sel[moved]] = True
+            # Predecessores chegam a um presente ainda não coletado com a
+            # máscara sem o bit dele e passam a tê-lo ao entrar na célula
+            bit = self._item_bits.get(pos, 0)
+            if bit:
+                changed = changed[masks | bit]
+            priority = float(change.max())
+            for prev in neighbours(pos):
+                push(prev, changed, priority)
+
+        return updates
 
     # --------------------------------------------------------------------- #
     # Teste (política greedy)
@@ -252,8 +599,7 @@ class LearningAgent:
             handle_events()
 
             item_index = self._items_to_index(collected_items)
-            q_values = self.q_table[state[0], state[1], item_index]
-            action = int(np.argmax(q_values))
+            action = self._greedy_action(state, item_index)
 
             # Executa ação
             next_state, next_items, reward, done, new_status = self.simulator.step(
@@ -1,6 +1,10 @@
 from utils import initialize_display, terminate_display
 from simulator import Simulator
 from learner import LearningAgent
+from hierarchical import HierarchicalAgent
+from evaluation import evaluate_policy, print_evaluation
+from parallel import train_parallel
+from planner import MCTSPlanner
 
 # ============================================================
 # Configuração do ambiente
@@ -13,6 +17,18 @@ from learner import LearningAgent
 # ============================================================
 ENV_MODE = "CUSTOM"
 
+# ------------------------------------------------------------
+# AGENT_MODE pode ser:
+#   "FLAT"          -> Q-Learning sobre ações primitivas
+#   "HIERARCHICAL"  -> Q-Learning sobre opções (ir até presente / porta)
+#   "MCTS"          -> planejamento online (sem treino / sem Q-Table)
+# ------------------------------------------------------------
+AGENT_MODE = "FLAT"
+
+# Número de processos de treino (apenas FLAT). Com mais de 1, os workers
+# atualizam a mesma Q-Table em memória compartilhada, sem renderização.
+TRAIN_WORKERS = 1
+
 # ------------------------------------------------------------
 # Grid CUSTOM (usado somente se ENV_MODE == "CUSTOM")
 #
@@ -85,18 +101,38 @@ def main():
     # --------------------------------------------------------
     screen, cell_size = initialize_display(simulator)
 
-    # Cria o agente de aprendizado
-    agent = LearningAgent(simulator)
-
-    # --------------------------------------------------------
-    # Treinamento (não estamos salvando Q-Table em arquivo)
-    # --------------------------------------------------------
-    agent.train(screen, cell_size)
+    if AGENT_MODE == "MCTS":
+        # Planejamento online a cada passo, sem treino prévio
+        planner = MCTSPlanner(simulator)
+        status, collected_items, steps = planner.play(screen, cell_size)
+    else:
+        # Cria o agente de aprendizado
+        if AGENT_MODE == "HIERARCHICAL":
+            agent = HierarchicalAgent(simulator)
+        else:
+            agent = LearningAgent(simulator)
+
+        # ----------------------------------------------------
+        # Treinamento (não estamos salvando Q-Table em arquivo)
+        # ----------------------------------------------------
+        if AGENT_MODE == "FLAT" and TRAIN_WORKERS > 1:
+            stats = train_parallel(agent, num_workers=TRAIN_WORKERS)
+            print(
+                f"Treino paralelo ({stats['workers']} processos): "
+                f"{stats['steps_per_sec']:.0f} passos/s em {stats['elapsed']:.1f}s"
+            )
+        else:
+            agent.train(screen, cell_size)
+
+        # Avaliação em lote da política greedy a partir de todas as células livres
+        if AGENT_MODE == "FLAT":
+            print_evaluation(evaluate_policy(agent))
+
+        # ----------------------------------------------------
+        # Teste do agente treinado (política greedy)
+        # ----------------------------------------------------
+        status, collected_items, steps = agent.test(screen, cell_size)
 
-    # --------------------------------------------------------
-    # Teste do agente treinado (política greedy)
-    # --------------------------------------------------------
-    status, collected_items, steps = agent.test(screen, cell_size)
     total_reward = simulator.total_reward
 
     print("---------------------")
@@ -0,0 +1,216 @@
+import csv
+import json
+import math
+import os
+import queue
+import threading
+from collections import Counter
+
+import numpy as np
+
+
+class RollingWindow:
+    """
+    Janela circular de tamanho fixo com média e variância móveis em O(1).
+    Mantém soma e soma dos quadrados dos últimos `size` valores.
+    """
+
+    def __init__(self, size=1000):
+        self.size = size
+        self.values = np.zeros(size, dtype=float)
+        self.count = 0        # quantos valores já entraram (total)
+        self._index = 0       # próxima posição a sobrescrever
+        self._sum = 0.0
+        self._sum_sq = 0.0
+
+    def push(self, value):
+        """Adiciona um valor, descartando o mais antigo se a janela estiver cheia."""
+        value = float(value)
+        if self.count >= self.size:
+            old = self.values[self._index]
+            self._sum -= old
+            self._sum_sq -= old * old
+
+        self.values[self._index] = value
+        self._sum += value
+        self._sum_sq += value * value
+        self._index = (self._index + 1) % self.size
+        self.count += 1
+
+    def __len__(self):
+        return min(self.count, self.size)
+
+    @property
+    def mean(self):
+        n = len(self)
+        return self._sum / n if n else 0.0
+
+    @property
+    def variance(self):
+        n = len(self)
+        if n < 2:
+            return 0.0
+        # max(...) protege contra pequenos negativos por erro de arredondamento
+        return max(0.0, (self._sum_sq - self._sum * self._sum / n) / (n - 1))
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+
+class EWMA:
+    """Média e variância exponencialmente ponderadas (memória constante)."""
+
+    def __init__(self, alpha=0.01):
+        self.alpha = alpha
+        self.mean = 0.0
+        self.variance = 0.0
+        self._started = False
+
+    def push(self, value):
+        value = float(value)
+        if not self._started:
+            self.mean = value
+            self._started = True
+            return
+
+        delta = value - self.mean
+        self.mean += self.alpha * delta
+        self.variance = (1.0 - self.alpha) * (self.variance + self.alpha * delta * delta)
+
+
+class MetricsSink:
+    """
+    Grava registros de métricas em JSONL ou CSV (pela extensão do arquivo)
+    numa thread em segundo plano, com buffer limitado.
+    O treino só faz `put` numa fila; a escrita em disco fica fora do loop.
+    O arquivo é aberto no construtor (erros de caminho aparecem na hora) e
+    erros da thread de escrita são relançados em write()/close().
+    """
+
+    def __init__(self, path, flush_every=100, max_pending=10000):
+        self.path = path
+        self.flush_every = flush_every
+        self.use_csv = os.path.splitext(path)[1].lower() == ".csv"
+
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        self._error = None
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _check_error(self):
+        if self._error is not None:
+            raise RuntimeError(
+                f"Falha ao gravar métricas em {self.path}"
+            ) from self._error
+
+    def _put(self, item):
+        # Com timeout: se a thread de escrita morrer com a fila cheia,
+        # o erro é relançado em vez de bloquear para sempre
+        while True:
+            self._check_error()
+            try:
+                self._queue.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                pass
+
+    def write(self, record):
+        """Enfileira um registro (dict). Bloqueia apenas se a fila encher."""
+        self._put(record)
+
+    def close(self):
+        """Descarrega o que estiver pendente e encerra a thread de escrita."""
+        if self._thread.is_alive():
+            self._put(None)
+            self._thread.join()
+        self._check_error()
+
+    def _run(self):
+        try:
+            self._write_loop(self._file)
+        except BaseException as exc:
+            self._error = exc
+        finally:
+            self._file.close()
+
+    def _write_loop(self, file):
+        writer = None
+        pending = []
+
+        while True:
+            try:
+                record = self._queue.get(timeout=1.0)
+            except queue.Empty:
+                record = False  # tempo esgotado: força flush do que houver
+
+            if record:
+                pending.append(record)
+
+            if pending and (record is None or record is False
+                            or len(pending) >= self.flush_every):
+                if self.use_csv:
+                    if writer is None:
+                        writer = csv.DictWriter(file, fieldnames=list(pending[0]))
+                        writer.writeheader()
+                    writer.writerows(pending)
+                else:
+                    file.writelines(
+                        json.dumps(rec, ensure_ascii=False) + "\n" for rec in pending
+                    )
+                file.flush()
+                pending = []
+
+            if record is None:
+                break
+
+
+class TrainingMetrics:
+    """
+    Métricas de treino em memória O(1) por episódio:
+    - recompensa: janela móvel (média/desvio) e EWMA
+    - passos por episódio: janela móvel e EWMA
+    - contagem de status terminais (zumbi, saída, limite de passos...)
+    Opcionalmente repassa cada episódio para um MetricsSink.
+    """
+
+    def __init__(self, window_size=1000, alpha=0.01, path=None, log_every=1):
+        self.window_size = window_size
+        self.rewards = RollingWindow(window_size)
+        self.steps = RollingWindow(window_size)
+        self.reward_ewma = EWMA(alpha)
+        self.steps_ewma = EWMA(alpha)
+        self.status_counts = Counter()
+        self.episodes = 0
+
+        self.log_every = log_every
+        self.sink = MetricsSink(path) if path else None
+
+    def record(self, episode, reward, steps, status, exploration_rate):
+        """Registra o resultado de um episódio."""
+        self.rewards.push(reward)
+        self.steps.push(steps)
+        self.reward_ewma.push(reward)
+        self.steps_ewma.push(steps)
+        self.status_counts[status] += 1
+        self.episodes += 1
+
+        if self.sink is not None and episode % self.log_every == 0:
+            self.sink.write(
+                {
+                    "episode": episode,
+                    "reward": reward,
+                    "steps": steps,
+                    "status": status,
+                    "epsilon": exploration_rate,
+                    "reward_mean": self.rewards.mean,
+                    "reward_std": self.rewards.std,
+                    "reward_ewma": self.reward_ewma.mean,
+                    "steps_mean": self.steps.mean,
+                }
+            )
+
+    def close(self):
+        if self.sink is not None:
+            self.sink.close()
@@ -0,0 +1,185 @@
+import os
+import time
+
+import numpy as np
+
+# Registro binário de uma transição (state, action, reward, next_state, done).
+# As máscaras usam a mesma codificação de LearningAgent._items_to_index.
+TRANSITION_DTYPE = np.dtype(
+    [
+        ("row", np.int16),
+        ("col", np.int16),
+        ("mask", np.int64),
+        ("action", np.int8),
+        ("reward", np.float32),
+        ("next_row", np.int16),
+        ("next_col", np.int16),
+        ("next_mask", np.int64),
+        ("done", np.bool_),
+    ]
+)
+
+
+class TransitionLogWriter:
+    """
+    Grava transições em um arquivo binário bruto (TRANSITION_DTYPE),
+    em blocos, para que logs maiores que a RAM possam ser acrescentados.
+    """
+
+    def __init__(self, path, buffer_size=65536, append=False):
+        self.file = open(path, "ab" if append else "wb")
+        self.buffer = np.zeros(buffer_size, dtype=TRANSITION_DTYPE)
+        self.count = 0
+
+    def write(self, state, item_index, action, reward, next_state,
+              next_item_index, done):
+        self.buffer[self.count] = (
+            state[0], state[1], item_index, action, reward,
+            next_state[0], next_state[1], next_item_index, done,
+        )
+        self.count += 1
+        if self.count == len(self.buffer):
+            self.flush()
+
+    def flush(self):
+        self.buffer[: self.count].tofile(self.file)
+        self.count = 0
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def load_transitions(path):
+    """
+    Abre o log como memmap somente leitura (nada é carregado na RAM).
+    Um log vazio vira um array vazio (np.memmap não mapeia arquivos vazios).
+    """
+    if os.path.getsize(path) == 0:
+        return np.zeros(0, dtype=TRANSITION_DTYPE)
+    return np.memmap(path, dtype=TRANSITION_DTYPE, mode="r")
+
+
+def record_transitions(agent, path, episodes, append=False):
+    """
+    Joga `episodes` episódios com a política epsilon-greedy atual do agente
+    (sem atualizar a tabela Q) e grava as transições em `path`.
+    Retorna o número de transições gravadas.
+    """
+    simulator = agent.simulator
+    total = 0
+
+    with TransitionLogWriter(path, append=append) as writer:
+        for _ in range(episodes):
+            state, collected_items = simulator.reset()
+            item_index = agent._items_to_index(collected_items)
+            done = False
+            steps = 0
+
+            while not done and steps < agent.max_steps:
+                action = agent.choose_action(state, collected_items)
+                next_state, next_items, reward, done, _ = simulator.step(action)
+                next_item_index = agent._items_to_index(next_items)
+
+                writer.write(
+                    state, item_index, action, reward,
+                    next_state, next_item_index, done,
+                )
+
+                state, collected_items = next_state, next_items
+                item_index = next_item_index
+                steps += 1
+                total += 1
+
+    return total
+
+
+def fitted_q_iteration(agent, path, sweeps=50, chunk_size=1_000_000, tol=1e-6):
+    """
+    Q-iteration offline sobre um log de transições (sem re-simular).
+
+    Cada varredura congela Q_k, calcula V_k(s) = max_a Q_k(s, a) (respeitando
+    use_action_mask) e percorre o log em blocos do memmap:
+        y = r + gamma * V_k(s')   (apenas r em transições terminais)
+    Os alvos são espalhados na nova tabela com np.maximum.at (scatter-max).
+    Como o ambiente é determinístico, todos os alvos de um mesmo (s, a)
+    coincidem.
+
+    Ações sem nenhuma amostra, em estados que aparecem no log, recebem o
+    limite pessimista r_min / (1 - gamma): caso contrário o zero inicial
+    seria otimista e a política greedy iria para fora dos dados.
+    Estados ausentes do log mantêm os valores anteriores.
+
+    Imprime e retorna o resíduo de Bellman (máx. |Q_k+1 - Q_k|) por varredura.
+    Ao final, agent.q_table recebe a tabela ajustada.
+    """
+    transitions = load_transitions(path)
+    n = len(transitions)
+    size = agent.grid_size
+    num_masks = agent.q_table.shape[2]
+    gamma = agent.discount_factor
+
+    q_table = np.array(agent.q_table, dtype=float)
+    flat_shape = q_table.size
+    residuals = []
+
+    min_reward = float(transitions["reward"].min()) if n else 0.0
+    pessimistic = min(min_reward, min_reward / (1.0 - gamma))
+
+    print("---------------------------------")
+    print(f"Q-ITERATION OFFLINE ({n} transições)...")
+
+    for sweep in range(1, sweeps + 1):
+        start = time.perf_counter()
+
+        q_values = q_table
+        if agent.use_action_mask:
+            q_values = q_table + agent._action_penalty[:, :, None, :]
+        values = q_values.max(axis=-1).reshape(-1)  # V_k por (célula, máscara)
+
+        targets = np.full(flat_shape, -np.inf)
+        for begin in range(0, n, chunk_size):
+            chunk = transitions[begin: begin + chunk_size]
+
+            state_index = (
+                chunk["row"].astype(np.int64) * size + chunk["col"]
+            ) * num_masks + chunk["mask"]
+            next_index = (
+                chunk["next_row"].astype(np.int64) * size + chunk["next_col"]
+            ) * num_masks + chunk["next_mask"]
+
+            y = chunk["reward"].astype(float)
+            alive = ~chunk["done"]
+            y[alive] += gamma * values[next_index[alive]]
+
+            np.maximum.at(targets, state_index * 4 + chunk["action"], y)
+
+        seen = (targets != -np.inf).reshape(q_table.shape)
+        covered = seen.any(axis=-1, keepdims=True)
+        new_q = np.where(
+            seen,
+            targets.reshape(q_table.shape),
+            np.where(covered, pessimistic, q_table),
+        )
+
+        residual = float(np.max(np.abs(new_q - q_table))) if n else 0.0
+        residuals.append(residual)
+        q_table = new_q
+
+        elapsed = time.perf_counter() - start
+        print(
+            f"Varredura {sweep:3d} | resíduo de Bellman: {residual:10.6f} | "
+            f"{n / elapsed if elapsed else 0.0:12.0f} transições/s"
+        )
+
+        if residual <= tol:
+            break
+
+    agent.set_q_table(q_table)
+    return residuals
@@ -0,0 +1,278 @@
+import importlib.util
+import multiprocessing as mp
+import os
+
+import numpy as np
+import pygame
+
+BACKGROUND_COLOR = (100, 200, 120)
+LINE_COLOR = (0, 0, 0)
+INFO_HEIGHT = 40  # espaço extra para textos, como em initialize_display
+
+
+class SpriteAtlas:
+    """
+    Sprites já redimensionados para um tamanho de célula.
+    Carregados uma única vez e sem depender de uma janela (sem convert_alpha).
+    """
+
+    FILES = {
+        "robot": ("assets/images/agent.png", (0, 0, 255)),
+        "goal": ("assets/images/goal.png", (0, 255, 0)),
+        "zombie": ("assets/images/zombie.png", (255, 0, 0)),
+        "present": ("assets/images/present.png", (255, 215, 0)),
+        "obstacle": ("assets/images/obstacle.png", (100, 100, 100)),
+    }
+
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+        self.sprites = {
+            name: self._load(filename, color)
+            for name, (filename, color) in self.FILES.items()
+        }
+
+    def _load(self, filename, fallback_color):
+        size = (self.cell_size, self.cell_size)
+        try:
+            return pygame.transform.smoothscale(pygame.image.load(filename), size)
+        except Exception:
+            surf = pygame.Surface(size, pygame.SRCALPHA)
+            surf.fill(fallback_color)
+            return surf
+
+    def __getitem__(self, name):
+        return self.sprites[name]
+
+
+class FrameRenderer:
+    """
+    Compõe quadros de um Simulator em superfícies comuns (sem display).
+    As partes estáticas do mapa (fundo, zumbis, obstáculos, porta e linhas)
+    são desenhadas uma vez; cada quadro só acrescenta presentes, agente e texto.
+    """
+
+    def __init__(self, simulator, cell_size=40):
+        self.simulator = simulator
+        self.cell_size = cell_size
+        self.atlas = SpriteAtlas(cell_size)
+
+        if not pygame.font.get_init():
+            pygame.font.init()
+        self.font = pygame.font.SysFont(None, 24)
+
+        size = simulator.size * cell_size
+        self.frame = pygame.Surface((size, size + INFO_HEIGHT))
+        self.background = self._build_background()
+        self.lines = self._build_lines()
+
+    def _cell_rect(self, pos):
+        i, j = pos
+        return pygame.Rect(
+            j * self.cell_size, i * self.cell_size, self.cell_size, self.cell_size
+        )
+
+    def _build_background(self):
+        background = self.frame.copy()
+        background.fill(BACKGROUND_COLOR)
+        for pos in self.simulator.zombie_positions:
+            background.blit(self.atlas["zombie"], self._cell_rect(pos))
+        for pos in self.simulator.obstacle_positions:
+            background.blit(self.atlas["obstacle"], self._cell_rect(pos))
+        background.blit(self.atlas["goal"], self._cell_rect(self.simulator.goal_position))
+        return background
+
+    def _build_lines(self):
+        size = self.simulator.size
+        lines = pygame.Surface(self.frame.get_size(), pygame.SRCALPHA)
+        for k in range(size + 1):
+            pygame.draw.line(
+                lines, LINE_COLOR,
+                (0, k * self.cell_size), (size * self.cell_size, k * self.cell_size),
+            )
+            pygame.draw.line(
+                lines, LINE_COLOR,
+                (k * self.cell_size, 0), (k * self.cell_size, size * self.cell_size),
+            )
+        return lines
+
+    def draw(self, position, collected_presents, total_reward, steps):
+        """Desenha um quadro e retorna a superfície (reutilizada entre chamadas)."""
+        frame = self.frame
+        frame.blit(self.background, (0, 0))
+
+        for pos in self.simulator.present_positions:
+            if pos not in collected_presents:
+                frame.blit(self.atlas["present"], self._cell_rect(pos))
+
+        # O agente cobre o que estiver na célula (porta/presente)
+        robot_rect = self._cell_rect(position)
+        frame.fill(BACKGROUND_COLOR, robot_rect)
+        frame.blit(self.atlas["robot"], robot_rect)
+
+        frame.blit(self.lines, (0, 0))
+
+        info_text = f"Recompensa: {total_reward:.1f}  |  Passos: {steps}"
+        frame.blit(self.font.render(info_text, True, LINE_COLOR), (5, 5))
+        return frame
+
+
+def greedy_episode(simulator, q_table, items_to_collect, start, max_steps,
+                   use_action_mask=True):
+    """
+    Gera os estados de um episódio da política greedy a partir de `start`,
+    usando Simulator.transition (não altera o simulador).
+    Produz tuplas (posição, presentes_coletados, recompensa_total, passos).
+    """
+    valid = simulator.valid_action_table
+    k = len(items_to_collect)
+    item_bit = {pos: 1 << (k - 1 - i) for i, pos in enumerate(items_to_collect)}
+
+    position = start
+    collected = frozenset()
+    mask = 0
+    total_reward = 0.0
+    steps = 0
+    yield position, collected, total_reward, steps
+
+    done = False
+    while not done and steps < max_steps:
+        q_values = q_table[position[0], position[1], mask]
+        if use_action_mask:
+            q_values = np.where(valid[position[0], position[1]], q_values, -np.inf)
+        action = int(np.argmax(q_values))
+        position, new_present, reward, done, _ = simulator.transition(
+            position, collected, action
+        )
+        if new_present is not None:
+            collected = collected | {new_present}
+            mask |= item_bit[new_present]
+        total_reward += reward
+        steps += 1
+        yield position, collected, total_reward, steps
+
+
+# ------------------------------------------------------------------------- #
+# Renderização em lote (processos)
+# ------------------------------------------------------------------------- #
+
+_worker_state = {}
+
+
+def _init_worker(simulator, q_table, items_to_collect, max_steps,
+                 use_action_mask, cell_size, out_dir, fmt, frame_ms):
+    """
+    Prepara o estado de renderização (atlas/fundo em cache). Limpa o estado
+    anterior: com workers=1 ele vive no processo chamador e a paleta de uma
+    chamada anterior (outro mapa/tamanho) não pode ser reaproveitada.
+    """
+    _worker_state.clear()
+    _worker_state.update(
+        simulator=simulator,
+        q_table=q_table,
+        items_to_collect=items_to_collect,
+        max_steps=max_steps,
+        use_action_mask=use_action_mask,
+        renderer=FrameRenderer(simulator, cell_size),
+        out_dir=out_dir,
+        fmt=fmt,
+        frame_ms=frame_ms,
+    )
+
+
+def _init_pool_worker(*args):
+    """Inicializador dos processos do pool: driver SDL sem janela."""
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    _init_worker(*args)
+
+
+def _surface_to_image(surface):
+    """
+    Converte o quadro para imagem de paleta (GIF). A paleta é calculada uma
+    vez por processo, no primeiro quadro (todos os presentes visíveis), e
+    reaproveitada: quantizar contra paleta fixa é muito mais barato.
+    """
+    from PIL import Image
+
+    image = Image.frombytes(
+        "RGB", surface.get_size(), pygame.image.tobytes(surface, "RGB")
+    )
+    if "palette" not in _worker_state:
+        _worker_state["palette"] = image.quantize(colors=256)
+    return image.quantize(
+        palette=_worker_state["palette"], dither=Image.Dither.NONE
+    )
+
+
+def _render_episode(task):
+    """Renderiza um episódio em PNGs ou GIF, quadro a quadro (memória limitada)."""
+    episode_id, start = task
+    state = _worker_state
+    renderer = state["renderer"]
+    frames = (
+        renderer.draw(*frame_state)
+        for frame_state in greedy_episode(
+            state["simulator"], state["q_table"], state["items_to_collect"],
+            start, state["max_steps"], state["use_action_mask"],
+        )
+    )
+    name = f"episode_{episode_id:04d}"
+
+    if state["fmt"] == "png":
+        path = os.path.join(state["out_dir"], name)
+        os.makedirs(path, exist_ok=True)
+        for index, frame in enumerate(frames):
+            pygame.image.save(frame, os.path.join(path, f"frame_{index:04d}.png"))
+        return path
+
+    # GIF: quadros convertidos um a um para paleta de 8 bits; a memória fica
+    # limitada a max_steps + 1 quadros pequenos por episódio
+    path = os.path.join(state["out_dir"], f"{name}.gif")
+    images = (_surface_to_image(frame) for frame in frames)
+    first = next(images)
+    first.save(
+        path,
+        save_all=True,
+        append_images=images,
+        duration=state["frame_ms"],
+        loop=0,
+    )
+    return path
+
+
+def render_episodes(agent, out_dir, starts=None, fmt="gif", cell_size=40,
+                    workers=None, frame_ms=200):
+    """
+    Renderiza, sem janela, episódios da política greedy de `agent`
+    (um por posição inicial em `starts`; padrão: todas as células livres).
+    fmt="png" gera uma pasta de quadros por episódio; fmt="gif" um GIF animado
+    (requer Pillow). Os episódios são distribuídos entre `workers` processos.
+    Retorna a lista de caminhos gerados.
+    """
+    if fmt not in ("png", "gif"):
+        raise ValueError("Formato inválido. Use 'png' ou 'gif'.")
+    if fmt == "gif" and importlib.util.find_spec("PIL") is None:
+        raise ImportError("Exportar GIF requer Pillow: pip install pillow")
+
+    simulator = agent.simulator
+    if starts is None:
+        blocked = set(simulator.zombie_positions) | set(simulator.obstacle_positions)
+        starts = [
+            (i, j)
+            for i in range(simulator.size)
+            for j in range(simulator.size)
+            if (i, j) not in blocked
+        ]
+
+    os.makedirs(out_dir, exist_ok=True)
+    tasks = list(enumerate(starts))
+    init_args = (
+        simulator, agent.q_table, agent.items_to_collect, agent.max_steps,
+        agent.use_action_mask, cell_size, out_dir, fmt, frame_ms,
+    )
+
+    if workers == 1:
+        _init_worker(*init_args)
+        return [_render_episode(task) for task in tasks]
+
+    with mp.Pool(workers, initializer=_init_pool_worker, initargs=init_args) as pool:
+        return list(pool.imap(_render_episode, tasks))
@@ -0,0 +1,242 @@
+import math
+import multiprocessing as mp
+import random
+import time
+from multiprocessing import shared_memory
+from multiprocessing.connection import wait
+
+import numpy as np
+
+from evaluation import evaluate_policy
+from learner import LearningAgent
+
+
+class _SharedTableAgent(LearningAgent):
+    """LearningAgent cuja tabela Q é uma visão de memória compartilhada."""
+
+    def __init__(self, simulator, q_table):
+        self._shared_table = q_table
+        super().__init__(simulator)
+
+    def _build_q_table(self):
+        return self._shared_table
+
+    def _rebuild_greedy_cache(self):
+        # Outros processos escrevem na tabela: um cache local de max/argmax
+        # ficaria desatualizado, então cada passo consulta a tabela.
+        self.cache_greedy = False
+
+
+def _exploration_floor(agent, worker_id, num_workers):
+    """
+    Epsilon mínimo de cada worker (esquema estilo Ape-X): o worker 0
+    explora mais e o último converge para o min_exploration do agente.
+    """
+    if num_workers == 1:
+        return agent.min_exploration
+    floor = 0.4 ** (1 + 7 * worker_id / (num_workers - 1))
+    return max(agent.min_exploration, floor)
+
+
+def _worker(shm_name, shape, simulator, worker_id, num_workers, episodes,
+            seed, stop_event, step_counter):
+    """
+    Processo de treino: roda episódios no seu próprio Simulator e atualiza
+    a tabela Q compartilhada sem travas (Hogwild).
+    """
+    random.seed(seed)
+    np.random.seed(seed % 2**32)
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        q_table = np.ndarray(shape, dtype=float, buffer=shm.buf)
+        agent = _SharedTableAgent(simulator, q_table)
+        floor = _exploration_floor(agent, worker_id, num_workers)
+
+        for _ in range(episodes):
+            if stop_event.is_set():
+                break
+
+            _, steps, _, _ = agent._train_episode(events=False)
+            agent.exploration_rate = max(
+                floor,
+                agent.exploration_rate * (1.0 - agent.exploration_decay),
+            )
+
+            with step_counter.get_lock():
+                step_counter.value += steps
+
+        # A visão precisa ser liberada antes de fechar o segmento
+        del agent, q_table
+    finally:
+        shm.close()
+
+
+def _converged(agent):
+    """Critério de convergência: a política greedy a partir do início escapa."""
+    i, j = agent.simulator.start_position
+    return bool(evaluate_policy(agent)["success"][i, j, 0])
+
+
+def train_parallel(agent, num_workers=4, episodes=None, seed=0,
+                   check_interval=0.25, stop_on_convergence=False):
+    """
+    Treina `agent.q_table` com K processos em paralelo. A tabela fica em
+    multiprocessing.shared_memory e cada worker a atualiza sem travas
+    (Hogwild), com semente e epsilon próprios. O processo principal
+    verifica a convergência da política greedy a cada `check_interval` s.
+
+    Retorna dict com passos totais, tempo, passos/s e tempo até convergência
+    (início da última sequência de verificações convergidas; None se a
+    tabela final não converge).
+    """
+    episodes = episodes if episodes is not None else agent.total_episodes
+    per_worker = math.ceil(episodes / num_workers)
+    shape = agent.q_table.shape
+    original = agent.q_table
+
+    shm = shared_memory.SharedMemory(create=True, size=agent.q_table.nbytes)
+    shared = None
+    try:
+        shared = np.ndarray(shape, dtype=float, buffer=shm.buf)
+        shared[:] = agent.q_table
+        agent.set_q_table(shared)
+
+        stop_event = mp.Event()
+        step_counter = mp.Value("q", 0)
+        seeds = np.random.SeedSequence(seed).spawn(num_workers)
+        processes = [
+            mp.Process(
+                target=_worker,
+                args=(
+                    shm.name, shape, agent.simulator, worker_id, num_workers,
+                    per_worker, int(seeds[worker_id].generate_state(1)[0]),
+                    stop_event, step_counter,
+                ),
+            )
+            for worker_id in range(num_workers)
+        ]
+
+        start = time.perf_counter()
+        for process in processes:
+            process.start()
+
+        converged_at = None
+        running = [process.sentinel for process in processes]
+        while running:
+            # Espera qualquer worker terminar, no máximo check_interval s
+            # (join só do primeiro viraria espera ativa quando ele acabasse)
+            finished = wait(running, timeout=check_interval)
+            running = [sentinel for sentinel in running if sentinel not in finished]
+            # Atualizações Hogwild posteriores podem desfazer a convergência
+            if not _converged(agent):
+                converged_at = None
+            elif converged_at is None:
+                converged_at = time.perf_counter() - start
+                if stop_on_convergence:
+                    stop_event.set()
+
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - start
+
+        # Só conta a convergência se a tabela final ainda converge
+        if not _converged(agent):
+            converged_at = None
+        elif converged_at is None:
+            converged_at = elapsed
+
+        agent.set_q_table(shared.copy())
+    finally:
+        # Nenhuma visão do segmento pode sobreviver a shm.close()
+        if agent.q_table is shared:
+            agent.set_q_table(original)
+        del shared
+        shm.close()
+        shm.unlink()
+
+    total_steps = step_counter.value
+    return {
+        "workers": num_workers,
+        "steps": total_steps,
+        "elapsed": elapsed,
+        "steps_per_sec": total_steps / elapsed if elapsed else 0.0,
+        "time_to_convergence": converged_at,
+    }
+
+
+def train_single(agent, episodes=None, check_interval=0.25,
+                 stop_on_convergence=False):
+    """
+    Laço de treino em um único processo (sem renderização), medido da mesma
+    forma que train_parallel para servir de referência.
+    """
+    episodes = episodes if episodes is not None else agent.total_episodes
+    total_steps = 0
+    converged_at = None
+
+    start = time.perf_counter()
+    last_check = start
+    for _ in range(episodes):
+        _, steps, _, _ = agent._train_episode(events=False)
+        total_steps += steps
+        agent.exploration_rate = max(
+            agent.min_exploration,
+            agent.exploration_rate * (1.0 - agent.exploration_decay),
+        )
+
+        now = time.perf_counter()
+        if now - last_check >= check_interval:
+            last_check = now
+            if not _converged(agent):
+                converged_at = None
+            elif converged_at is None:
+                converged_at = now - start
+                if stop_on_convergence:
+                    break
+
+    elapsed = time.perf_counter() - start
+    if not _converged(agent):
+        converged_at = None
+    elif converged_at is None:
+        converged_at = elapsed
+
+    return {
+        "workers": 1,
+        "steps": total_steps,
+        "elapsed": elapsed,
+        "steps_per_sec": total_steps / elapsed if elapsed else 0.0,
+        "time_to_convergence": converged_at,
+    }
+
+
+def compare_speedup(simulator, num_workers=4, episodes=None, seed=0):
+    """
+    Treina dois agentes novos (1 processo vs K processos) até a convergência
+    e imprime passos/s e o ganho no tempo até convergir.
+    """
+    random.seed(seed)
+    single = train_single(
+        LearningAgent(simulator), episodes, stop_on_convergence=True
+    )
+    parallel = train_parallel(
+        LearningAgent(simulator), num_workers, episodes, seed,
+        stop_on_convergence=True,
+    )
+
+    def fmt(seconds):
+        return f"{seconds:.2f}s" if seconds is not None else "não convergiu"
+
+    print("------------------------------------------------------")
+    for result in (single, parallel):
+        print(
+            f"{result['workers']} processo(s): "
+            f"{result['steps_per_sec']:10.0f} passos/s | "
+            f"convergência: {fmt(result['time_to_convergence'])}"
+        )
+    if single["time_to_convergence"] and parallel["time_to_convergence"]:
+        speedup = single["time_to_convergence"] / parallel["time_to_convergence"]
+        print(f"Ganho no tempo até convergência: {speedup:.2f}x")
+    print("------------------------------------------------------")
+
+    return single, parallel
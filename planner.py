@@ -0,0 +1,240 @@
+import math
+import random
+from collections import deque
+
+import numpy as np
+import pygame
+
+from utils import handle_events
+
+
+class MCTSPlanner:
+    """
+    Planejador online por Monte Carlo Tree Search (UCT).
+    Não usa tabela Q: a cada passo constrói uma árvore a partir do estado
+    atual do Simulator, ramificando com snapshot()/restore(), e escolhe a
+    ação mais visitada. Serve para mapas grandes demais para a q_table.
+
+    As estatísticas dos nós ficam em arrays NumPy (um índice por nó):
+        children[nó, ação] -> nó filho (-1 se ainda não expandido)
+        visits[nó, ação]   -> N(s, a)
+        values[nó, ação]   -> soma dos retornos de (s, a)
+    """
+
+    def __init__(self, simulator, simulations=300, exploration=10.0,
+                 rollout_depth=None, rollout_greedy=0.8, discount_factor=0.99,
+                 capacity=4096):
+        self.simulator = simulator
+        self.simulations = simulations          # orçamento por jogada
+        self.exploration = exploration          # constante do UCB (em unidades de recompensa)
+        self.rollout_depth = rollout_depth or simulator.size * 4
+        self.rollout_greedy = rollout_greedy    # prob. de seguir a heurística no rollout
+        self.discount_factor = discount_factor
+        self.max_steps = simulator.size * 10
+
+        self._moves = self._compute_moves()
+        self._distances = {
+            pos: self._distance_map(pos)
+            for pos in list(simulator.present_positions) + [simulator.goal_position]
+        }
+        self._allocate(capacity)
+
+    # --------------------------------------------------------------------- #
+    # Política de rollout
+    # --------------------------------------------------------------------- #
+
+    def _compute_moves(self):
+        """
+        Para cada célula, as ações seguras (saem do lugar sem pisar em zumbi)
+        e a célula de destino de cada uma.
+        """
+        sim = self.simulator
+        zombies = set(sim.zombie_positions)
+        moves = {}
+        for i in range(sim.size):
+            for j in range(sim.size):
+                safe = []
+                for action in range(4):
+                    nxt, _, _, _, _ = sim.transition((i, j), frozenset(), action)
+                    if nxt != (i, j) and nxt not in zombies:
+                        safe.append((action, nxt))
+                moves[(i, j)] = safe
+        return moves
+
+    def _distance_map(self, target):
+        """Distância BFS (evitando zumbis e obstáculos) de cada célula até `target`."""
+        size = self.simulator.size
+        dist = np.full((size, size), np.inf)
+        dist[target] = 0
+        queue = deque([target])
+        while queue:
+            cur = queue.popleft()
+            # Movimentos são simétricos: vizinhos seguros de cur chegam a cur
+            for _, nxt in self._moves[cur]:
+                if dist[nxt] == np.inf:
+                    dist[nxt] = dist[cur] + 1
+                    queue.append(nxt)
+        return dist
+
+    def _rollout_action(self):
+        """
+        Com probabilidade rollout_greedy, anda em direção ao presente não
+        coletado mais próximo (ou à porta, se já coletou todos); senão,
+        ação segura aleatória. Rollouts puramente aleatórios morrem ou vagam
+        tanto que "morrer já" (-10) parece melhor do que andar (-1/passo).
+        """
+        sim = self.simulator
+        moves = self._moves[sim.current_position]
+        if not moves:
+            return random.randint(0, 3)
+        if random.random() >= self.rollout_greedy:
+            return random.choice(moves)[0]
+
+        collected = sim.collected_presents
+        targets = [p for p in sim.present_positions if p not in collected]
+        if not targets:
+            targets = [sim.goal_position]
+
+        best_action, best_dist = moves[0][0], np.inf
+        for action, nxt in moves:
+            dist = min(self._distances[t][nxt] for t in targets)
+            if dist < best_dist:
+                best_action, best_dist = action, dist
+        return best_action
+
+    # --------------------------------------------------------------------- #
+    # Armazenamento dos nós
+    # --------------------------------------------------------------------- #
+
+    def _allocate(self, capacity):
+        self.capacity = capacity
+        self.children = np.full((capacity, 4), -1, dtype=np.int32)
+        self.visits = np.zeros((capacity, 4), dtype=np.int32)
+        self.values = np.zeros((capacity, 4), dtype=float)
+        self.num_nodes = 0
+
+    def _new_node(self):
+        """Reserva um nó, dobrando os arrays quando a capacidade acaba."""
+        if self.num_nodes == self.capacity:
+            extra = self.capacity
+            self.children = np.vstack(
+                [self.children, np.full((extra, 4), -1, dtype=np.int32)]
+            )
+            self.visits = np.vstack([self.visits, np.zeros((extra, 4), dtype=np.int32)])
+            self.values = np.vstack([self.values, np.zeros((extra, 4))])
+            self.capacity += extra
+
+        node = self.num_nodes
+        self.children[node] = -1
+        self.visits[node] = 0
+        self.values[node] = 0.0
+        self.num_nodes += 1
+        return node
+
+    # --------------------------------------------------------------------- #
+    # Busca
+    # --------------------------------------------------------------------- #
+
+    def _select_action(self, node):
+        """
+        UCB1 entre as ações válidas da célula atual: ações nunca tentadas
+        primeiro, depois média + bônus de exploração.
+        """
+        actions = np.array(self.simulator.valid_actions(self.simulator.current_position))
+        visits = self.visits[node, actions]
+        untried = actions[visits == 0]
+        if untried.size:
+            return int(random.choice(untried))
+
+        mean = self.values[node, actions] / visits
+        bonus = self.exploration * np.sqrt(math.log(visits.sum()) / visits)
+        return int(actions[np.argmax(mean + bonus)])
+
+    def _rollout(self, remaining_steps):
+        """Rollout heurístico até o fim, profundidade máxima ou limite de passos."""
+        total = 0.0
+        discount = 1.0
+        for _ in range(min(self.rollout_depth, remaining_steps)):
+            _, _, reward, done, _ = self.simulator.step(self._rollout_action())
+            total += discount * reward
+            discount *= self.discount_factor
+            if done:
+                break
+        return total
+
+    def plan(self):
+        """
+        Executa `simulations` iterações de MCTS a partir do estado atual do
+        simulador e retorna a melhor ação. O simulador volta ao estado inicial.
+        """
+        root_state = self.simulator.snapshot()
+        self.num_nodes = 0
+        root = self._new_node()
+
+        for _ in range(self.simulations):
+            self.simulator.restore(root_state)
+            node = root
+            path = []  # (nó, ação, recompensa)
+            done = False
+
+            # Seleção + expansão
+            while True:
+                action = self._select_action(node)
+                _, _, reward, done, _ = self.simulator.step(action)
+                path.append((node, action, reward))
+
+                if done or self.simulator.steps >= self.max_steps:
+                    break
+
+                child = self.children[node, action]
+                if child == -1:
+                    child = self._new_node()
+                    self.children[node, action] = child
+                    node = child
+                    break
+                node = child
+
+            # Simulação
+            remaining = self.max_steps - self.simulator.steps
+            ret = 0.0 if done else self._rollout(remaining)
+
+            # Retropropagação
+            for node, action, reward in reversed(path):
+                ret = reward + self.discount_factor * ret
+                self.visits[node, action] += 1
+                self.values[node, action] += ret
+
+        self.simulator.restore(root_state)
+        return int(np.argmax(self.visits[root]))
+
+    # --------------------------------------------------------------------- #
+    # Episódio completo
+    # --------------------------------------------------------------------- #
+
+    def play(self, screen=None, cell_size=None):
+        """
+        Joga um episódio escolhendo cada ação por MCTS.
+        Se `screen` for informado, renderiza cada passo.
+        Retorna (status, presentes_coletados, passos) como LearningAgent.test.
+        """
+        _, collected_items = self.simulator.reset()
+        done = False
+        steps = 0
+        status = "ANDANDO"
+
+        while not done and steps < self.max_steps:
+            action = self.plan()
+            _, collected_items, _, done, new_status = self.simulator.step(action)
+            steps += 1
+            if new_status:
+                status = new_status
+
+            if screen is not None:
+                handle_events()
+                self.simulator.render(screen, cell_size)
+                pygame.time.wait(300)
+
+        if not done and steps >= self.max_steps:
+            status = "LIMITE DE PASSOS / SEM SOLUÇÃO"
+
+        return status, collected_items, steps
@@ -1,9 +1,17 @@
 import random
 import pickle
+from collections import namedtuple
+
 import numpy as np
 import pygame
 
 
+# Estado dinâmico compacto e imutável de um episódio (ver Simulator.snapshot)
+SimulatorState = namedtuple(
+    "SimulatorState", ["position", "collected_mask", "total_reward", "steps"]
+)
+
+
 class Simulator:
     """
     Simulador do ambiente de grid com:
@@ -67,8 +75,19 @@ class Simulator:
                 )
                 self.save_grid()
 
+        # Presentes coletados ficam numa máscara de bits, na mesma codificação
+        # de LearningAgent._items_to_index (o primeiro presente de
+        # present_positions é o bit mais significativo): collected_mask
+        # serve direto como índice da q_table
+        num_presents = len(self.present_positions)
+        self._present_bits = {
+            pos: 1 << (num_presents - 1 - idx)
+            for idx, pos in enumerate(self.present_positions)
+        }
+        self._collected_sets = {0: frozenset()}
+
         # Estado dinâmico de um episódio
-        self.collected_presents = set()
+        self.collected_mask = 0
         self.current_position = self.start_position
         self.total_reward = 0
         self.steps = 0
@@ -81,6 +100,88 @@ class Simulator:
         for i, j in self.obstacle_positions:
             self.grid[i][j] = 3  # obstáculo
 
+        # Ações válidas por célula (calculadas uma vez por mapa)
+        self._compute_valid_actions()
+
+    def __getstate__(self):
+        """
+        Permite enviar o simulador para outros processos (pickle):
+        sprites do Pygame não são serializáveis e são recarregados sob demanda.
+        """
+        state = self.__dict__.copy()
+        state.pop("sprites", None)
+        return state
+
+    @property
+    def collected_presents(self):
+        """Conjunto (imutável) dos presentes já coletados no episódio."""
+        mask = self.collected_mask
+        if mask not in self._collected_sets:
+            self._collected_sets[mask] = frozenset(
+                pos for pos, bit in self._present_bits.items() if mask & bit
+            )
+        return self._collected_sets[mask]
+
+    # ------------------------------------------------------------------ #
+    # AÇÕES VÁLIDAS                                                      #
+    # ------------------------------------------------------------------ #
+
+    def _compute_valid_actions(self) -> None:
+        """
+        Calcula, para cada célula, quais ações realmente movem o agente.
+        Andar contra a borda ou contra um obstáculo mantém o agente no lugar
+        e só custa -1, então essas ações são marcadas como inválidas.
+
+        valid_action_masks[i, j] : bits 0..3 ligados para as ações válidas
+        valid_action_table[i, j] : o mesmo, como array booleano (size, size, 4)
+        """
+        self.valid_action_masks = np.zeros((self.size, self.size), dtype=np.uint8)
+        self._valid_actions = {}
+
+        for i in range(self.size):
+            for j in range(self.size):
+                actions = tuple(
+                    action for action in range(4)
+                    if self.transition((i, j), (), action)[0] != (i, j)
+                )
+                # Célula sem saída: mantém todas as ações para não travar a política
+                if not actions:
+                    actions = (0, 1, 2, 3)
+
+                self._valid_actions[(i, j)] = actions
+                for action in actions:
+                    self.valid_action_masks[i, j] |= 1 << action
+
+        self.valid_action_table = (
+            (self.valid_action_masks[:, :, None] >> np.arange(4)) & 1
+        ).astype(bool)
+
+    def valid_actions(self, position):
+        """Tupla com as ações que saem de `position` (ver _compute_valid_actions)."""
+        return self._valid_actions[position]
+
+    # ------------------------------------------------------------------ #
+    # SNAPSHOT / RESTORE                                                 #
+    # ------------------------------------------------------------------ #
+
+    def snapshot(self):
+        """
+        Captura o estado dinâmico do episódio em O(1), como SimulatorState
+        (alguns inteiros). O mapa estático não é copiado.
+        """
+        return SimulatorState(
+            self.current_position, self.collected_mask, self.total_reward, self.steps
+        )
+
+    def restore(self, state):
+        """Volta ao estado capturado por snapshot() em O(1)."""
+        (
+            self.current_position,
+            self.collected_mask,
+            self.total_reward,
+            self.steps,
+        ) = state
+
     # ------------------------------------------------------------------ #
     # CONFIGURAÇÃO DOS LAYOUTS FIXOS                                     #
     # ------------------------------------------------------------------ #
@@ -213,7 +314,7 @@ class Simulator:
     def reset(self):
         """Reinicia o ambiente para um novo episódio."""
         self.current_position = self.start_position
-        self.collected_presents.clear()
+        self.collected_mask = 0
         self.total_reward = 0
         self.steps = 0
         return self.current_position, tuple(self.collected_presents)
@@ -231,8 +332,30 @@ class Simulator:
         Retorna:
             next_position, collected_presents, reward, done, status
         """
+        position, new_present, reward, done, status = self.transition(
+            self.current_position, self.collected_presents, action
+        )
+
+        self.current_position = position
+        if new_present is not None:
+            self.collected_mask |= self._present_bits[new_present]
+
+        self.total_reward += reward
+        self.steps += 1
+
+        return self.current_position, tuple(self.collected_presents), reward, done, status
+
+    def transition(self, position, collected_presents, action: int):
+        """
+        Modelo do ambiente: calcula o resultado de uma ação a partir de
+        (position, collected_presents) sem alterar o estado do simulador.
+
+        Retorna:
+            next_position, presente_coletado (ou None), reward, done, status
+        """
         status = ""
-        i, j = self.current_position
+        new_present = None
+        i, j = position
 
         # Movimento
         if action == 0:      # CIMA
@@ -246,28 +369,28 @@ class Simulator:
 
         # Impede andar sobre obstáculos (pedras)
         if (i, j) in self.obstacle_positions:
-            i, j = self.current_position
+            i, j = position
 
-        self.current_position = (i, j)
+        position = (i, j)
 
         # ----------------- REGRAS DE RECOMPENSA ----------------- #
-        if self.current_position in self.zombie_positions:
+        if position in self.zombie_positions:
             reward = -10
             done = True
             status = "ATACADO POR ZUMBI"
 
         elif (
-            self.current_position in self.present_positions
-            and self.current_position not in self.collected_presents
+            position in self.present_positions
+            and position not in collected_presents
         ):
-            self.collected_presents.add(self.current_position)
+            new_present = position
             reward = +10
             done = False
             status = "COLETOU SUPRIMENTO"
 
-        elif self.current_position == self.goal_position:
+        elif position == self.goal_position:
             # Só pode escapar depois de pegar todos os presentes
-            if len(self.collected_presents) == self.num_presents:
+            if len(collected_presents) == self.num_presents:
                 reward = +20
                 done = True
                 status = "ALCANÇOU ÁREA SEGURA"
@@ -281,10 +404,47 @@ class Simulator:
             done = False
             status = "ANDANDO"
 
-        self.total_reward += reward
-        self.steps += 1
+        return position, new_present, reward, done, status
 
-        return self.current_position, tuple(self.collected_presents), reward, done, status
+    # ------------------------------------------------------------------ #
+    # COMPARAÇÃO DE MAPAS                                                #
+    # ------------------------------------------------------------------ #
+
+    def cell_types(self):
+        """
+        Tipo de cada célula não vazia, com a mesma legenda do mapa CUSTOM:
+        'R' início, 'S' saída, 'Z' zumbi, 'P' presente, '#' obstáculo.
+        """
+        cells = {}
+        for pos in self.obstacle_positions:
+            cells[pos] = "#"
+        for pos in self.present_positions:
+            cells[pos] = "P"
+        for pos in self.zombie_positions:
+            cells[pos] = "Z"
+        cells[self.start_position] = "R"
+        cells[self.goal_position] = "S"
+        return cells
+
+    def diff_map(self, other):
+        """
+        Compara este mapa com o de outro Simulator.
+        Retorna {célula: (tipo_aqui, tipo_no_outro)} apenas das células que
+        mudaram ('.' representa célula vazia).
+        """
+        if other.size != self.size:
+            raise ValueError("Não é possível comparar grids de tamanhos diferentes.")
+
+        old_cells = self.cell_types()
+        new_cells = other.cell_types()
+
+        changes = {}
+        for pos in set(old_cells) | set(new_cells):
+            before = old_cells.get(pos, ".")
+            after = new_cells.get(pos, ".")
+            if before != after:
+                changes[pos] = (before, after)
+        return changes
 
     # ------------------------------------------------------------------ #
     # RENDERIZAÇÃO                                                       #
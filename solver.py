@@ -0,0 +1,302 @@
+import multiprocessing as mp
+import os
+from math import comb
+
+import numpy as np
+
+from evaluation import transition_table
+
+
+def _popcounts(num_items):
+    """Número de bits de cada máscara 0..2**k-1 (vetorizado)."""
+    masks = np.arange(2**num_items, dtype=np.int64)
+    counts = np.zeros(len(masks), dtype=np.int8)
+    for bit in range(num_items):
+        counts += (masks >> bit) & 1
+    return counts
+
+
+def _mask_rank(mask):
+    """
+    Posição de `mask` dentro da sua camada (máscaras com o mesmo número de
+    bits). Em ordem numérica crescente, que coincide com a ordem colex:
+    rank = soma de C(posição do i-ésimo bit, i).
+    """
+    rank = 0
+    count = 0
+    bit = 0
+    while mask:
+        if mask & 1:
+            count += 1
+            rank += comb(bit, count)
+        mask >>= 1
+        bit += 1
+    return rank
+
+
+# ------------------------------------------------------------------------- #
+# Trabalho de cada processo
+# ------------------------------------------------------------------------- #
+
+_worker_state = {}
+
+
+def _init_worker(config):
+    _worker_state.clear()
+    _worker_state.update(config)
+
+
+def _solve_batch(task):
+    """
+    Resolve um lote de máscaras da mesma camada. Os valores das camadas
+    superiores entram apenas pelo valor de "chegada" em cada presente
+    (arrival[máscara, presente]), lido do disco.
+    """
+    popcount, offset, masks = task
+    state = _worker_state
+    gamma = state["gamma"]
+    next_cell = state["next_cell"]
+    is_zombie = state["is_zombie"]
+    present_bit = state["present_bit"]
+    present_index = state["present_index"]
+    goal_cell = state["goal_cell"]
+    full_mask = state["full_mask"]
+    floor = -1.0 / (1.0 - gamma)  # vagar para sempre sem sair da camada
+
+    arrival = np.load(state["arrival_path"], mmap_mode="r+")
+    num_cells = next_cell.shape[0]
+    batch = len(masks)
+
+    # Valor das ações que saem da camada (zumbi, presente novo, saída)
+    # e máscara das ações que permanecem nela
+    seed = np.full((batch, num_cells), floor)
+    internal = np.zeros((batch, num_cells, 4), dtype=bool)
+    for action in range(4):
+        nxt = next_cell[:, action]
+        bit = present_bit[nxt]
+        zombie = np.broadcast_to(is_zombie[nxt], (batch, num_cells))
+        new_present = ~zombie & (bit != 0) & ((masks[:, None] & bit) == 0)
+        escape = ~zombie & (nxt == goal_cell) & (masks == full_mask)[:, None]
+
+        exit_value = np.full((batch, num_cells), -np.inf)
+        exit_value[zombie] = -10.0
+        if new_present.any():
+            rows, cells = np.nonzero(new_present)
+            upper = masks[rows] | bit[cells]
+            exit_value[rows, cells] = 10.0 + gamma * arrival[
+                upper, present_index[nxt[cells]]
+            ]
+        exit_value[escape] = 20.0
+
+        seed = np.maximum(seed, exit_value)
+        internal[:, :, action] = ~(zombie | new_present | escape)
+
+    # Iteração de valor dentro da camada: todos os passos internos valem -1,
+    # então converge após o maior caminho ótimo da camada
+    # (limite de num_cells iterações: nenhum caminho mínimo é mais longo)
+    values = seed.copy()
+    for _ in range(num_cells):
+        moved = np.where(internal, -1.0 + gamma * values[:, next_cell], -np.inf)
+        new_values = np.maximum(seed, moved.max(axis=-1))
+        if np.array_equal(new_values, values):
+            break
+        values = new_values
+
+    # Valores de chegada desta camada, usados pelas camadas inferiores
+    present_cells = state["present_cells"]
+    own = (masks[:, None] & state["present_bits"][None, :]) != 0
+    arrival[masks[:, None], np.arange(len(present_cells))[None, :]] = np.where(
+        own, values[:, present_cells], np.nan
+    )
+    arrival.flush()
+
+    if state["layer_dir"] is not None:
+        layer = np.load(_layer_path(state["layer_dir"], popcount), mmap_mode="r+")
+        layer[offset: offset + batch] = values
+        layer.flush()
+
+    return batch
+
+
+def _layer_path(layer_dir, popcount):
+    return os.path.join(layer_dir, f"layer_{popcount:02d}.npy")
+
+
+class LayeredSolver:
+    """
+    Solver exato por indução reversa em camadas de máscaras.
+
+    Presentes só são coletados, nunca perdidos: o grafo de estados
+    (célula, máscara) só avança para máscaras com mais bits. Assim as
+    camadas são resolvidas da máscara completa até a vazia; em cada camada
+    resta um problema de caminho mínimo (passos internos valem -1) cujas
+    saídas têm valores já conhecidos das camadas superiores.
+
+    As máscaras de uma camada são divididas em lotes e distribuídas num
+    pool de processos. Tudo o que passa entre camadas fica em disco:
+      arrival.npy        [máscara, presente] valor ao chegar no presente
+      layer_XX.npy       valores V(máscara, célula) da camada XX (opcional)
+    Nunca se materializa a q_table de 2**k máscaras em memória.
+
+    A codificação das máscaras é a mesma de LearningAgent._items_to_index
+    (o primeiro presente de present_positions é o bit mais significativo).
+    Valores descontados de horizonte infinito (sem o limite max_steps).
+    """
+
+    def __init__(self, simulator, out_dir, discount_factor=0.99, workers=None,
+                 batch_size=None, store_values=True):
+        self.simulator = simulator
+        self.out_dir = out_dir
+        self.discount_factor = discount_factor
+        self.workers = workers
+        self.store_values = store_values
+
+        self.items_to_collect = list(simulator.present_positions)
+        self.num_items = len(self.items_to_collect)
+        self.full_mask = 2**self.num_items - 1
+        self.num_cells = simulator.size * simulator.size
+
+        # Lotes de ~2 milhões de (máscara, célula) por tarefa
+        self.batch_size = batch_size or max(1, 2_000_000 // self.num_cells)
+
+        self._layers = {}  # popcount -> memmap de layer_XX.npy (consultas)
+
+    def _cell(self, pos):
+        return pos[0] * self.simulator.size + pos[1]
+
+    def _config(self):
+        sim = self.simulator
+        k = self.num_items
+
+        is_zombie = np.zeros(self.num_cells, dtype=bool)
+        for pos in sim.zombie_positions:
+            is_zombie[self._cell(pos)] = True
+
+        present_bits = np.array(
+            [1 << (k - 1 - i) for i in range(k)], dtype=np.int64
+        )
+        present_cells = np.array(
+            [self._cell(pos) for pos in self.items_to_collect], dtype=np.int64
+        )
+        present_bit = np.zeros(self.num_cells, dtype=np.int64)
+        present_index = np.zeros(self.num_cells, dtype=np.int64)
+        present_bit[present_cells] = present_bits
+        present_index[present_cells] = np.arange(k)
+
+        return {
+            "gamma": self.discount_factor,
+            "next_cell": transition_table(sim),
+            "is_zombie": is_zombie,
+            "present_bit": present_bit,
+            "present_bits": present_bits,
+            "present_index": present_index,
+            "present_cells": present_cells,
+            "goal_cell": self._cell(sim.goal_position),
+            "full_mask": self.full_mask,
+            "arrival_path": os.path.join(self.out_dir, "arrival.npy"),
+            "layer_dir": self.out_dir if self.store_values else None,
+        }
+
+    def solve(self):
+        """Resolve todas as camadas, da máscara completa até a vazia."""
+        os.makedirs(self.out_dir, exist_ok=True)
+        config = self._config()
+        k = self.num_items
+        self._layers = {}
+
+        # Os arquivos só precisam existir antes que os workers os abram
+        np.lib.format.open_memmap(
+            config["arrival_path"], mode="w+", dtype=float,
+            shape=(2**k, max(k, 1)),
+        )
+
+        print("---------------------------------")
+        print(f"INDUÇÃO REVERSA POR CAMADAS ({k} presentes)...")
+
+        pool = None
+        if self.workers != 1:
+            pool = mp.Pool(self.workers, initializer=_init_worker, initargs=(config,))
+        else:
+            _init_worker(config)
+
+        popcounts = _popcounts(k)
+        try:
+            for popcount in range(k, -1, -1):
+                masks = np.flatnonzero(popcounts == popcount)
+                if self.store_values:
+                    np.lib.format.open_memmap(
+                        _layer_path(self.out_dir, popcount), mode="w+",
+                        dtype=float, shape=(len(masks), self.num_cells),
+                    )
+
+                tasks = [
+                    (popcount, start, masks[start: start + self.batch_size])
+                    for start in range(0, len(masks), self.batch_size)
+                ]
+                if pool is None:
+                    for task in tasks:
+                        _solve_batch(task)
+                else:
+                    pool.map(_solve_batch, tasks)
+
+                print(f"Camada {popcount:2d}: {len(masks)} máscaras")
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+        return self
+
+    # --------------------------------------------------------------------- #
+    # Consulta da solução
+    # --------------------------------------------------------------------- #
+
+    def values(self, mask):
+        """V(célula) para uma máscara, formato (size, size), lido do disco."""
+        if not self.store_values:
+            raise ValueError("Solver executado com store_values=False.")
+        popcount = bin(mask).count("1")
+        if popcount not in self._layers:
+            self._layers[popcount] = np.load(
+                _layer_path(self.out_dir, popcount), mmap_mode="r"
+            )
+        layer = self._layers[popcount]
+        size = self.simulator.size
+        return np.array(layer[_mask_rank(mask)]).reshape(size, size)
+
+    def q_values(self, position, mask):
+        """Q(posição, máscara, ação) para as 4 ações, a partir de V."""
+        sim = self.simulator
+        gamma = self.discount_factor
+        collected = frozenset(
+            pos for i, pos in enumerate(self.items_to_collect)
+            if mask & (1 << (self.num_items - 1 - i))
+        )
+        bits = {pos: 1 << (self.num_items - 1 - i)
+                for i, pos in enumerate(self.items_to_collect)}
+
+        q = np.zeros(4)
+        for action in range(4):
+            nxt, new_present, reward, done, _ = sim.transition(position, collected, action)
+            if done:
+                q[action] = reward
+            else:
+                next_mask = mask | bits.get(new_present, 0)
+                q[action] = reward + gamma * self.values(next_mask)[nxt]
+        return q
+
+    def greedy_action(self, position, mask):
+        return int(np.argmax(self.q_values(position, mask)))
+
+    def fill_q_table(self, agent):
+        """
+        Preenche agent.q_table com a solução exata (apenas para mapas cujo
+        q_table cabe em memória), para usar test()/evaluate_policy.
+        """
+        size = self.simulator.size
+        q_table = np.zeros_like(agent.q_table)
+        for mask in range(self.full_mask + 1):
+            for i in range(size):
+                for j in range(size):
+                    q_table[i, j, mask] = self.q_values((i, j), mask)
+        agent.set_q_table(q_table)